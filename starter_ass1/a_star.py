@@ -1,56 +1,20 @@
-import heapq
+import numpy as np
+from astar_numba import astar, _H_SHIFT, _H_MASK
 
 def a_star_search(initial_state, goal_state, map):
     """
     Performs A* search in given map with known initial and goal states.
-    """
-    open_heap = []
-    closed_dict = {}
-    expansions = 0
-    
-    #Update cost for initial state
-    initial_state.set_cost(initial_state.get_g() + h_value(initial_state, goal_state))
-    
-    #Insert initial state to open and closed
-    heapq.heappush(open_heap, initial_state)
-    closed_dict[initial_state.state_hash()] = initial_state.get_cost()
-
-    while len(open_heap) > 0:
-        expansions += 1
-        n = heapq.heappop(open_heap)
-        
-        if n == goal_state: 
-            return n.get_cost(), expansions
-        
-        #Get all children
-        successors = map.successors(n)
-        
-        for child in successors:
-
-            #calculate f-value of child
-            f_value = child.get_g() + h_value(child, goal_state)
-            #update cost of state 
-            child.set_cost(f_value)
 
-            #if child has not been seen
-            if child.state_hash() not in closed_dict or child.get_cost() < closed_dict[child.state_hash()]:
-                
-                #update cost of state 
-                child.set_cost(f_value)
-                
-                #Add to open and closed
-                heapq.heappush(open_heap, child)
-                closed_dict[child.state_hash()] = child.get_cost()
-
-    return -1, expansions
-
-def h_value(current_state, goal_state):
-    """
-    Will calculate the Octile distance from current state to goal state.
+    The search runs in the compiled kernel of astar_numba; this function only converts the map
+    and the states into the arrays and coordinates the kernel receives.
     """
-    delta_x = abs(current_state.get_x() - goal_state.get_x())
-    delta_y = abs(current_state.get_y() - goal_state.get_y())
+    #the kernel packs the cell index and 2 * h-value into fixed-width fields of its heap entries
+    if map.width * map.height >= 1 << _H_SHIFT:
+        raise ValueError('map of %d x %d cells is too large for the A* kernel' % (map.width, map.height))
+    if 2 * (map.width + map.height) * 1.5 > _H_MASK:
+        raise ValueError('heuristic values of a %d x %d map do not fit the A* kernel' % (map.width, map.height))
 
-    h = 1.5 * min(delta_x, delta_y) + abs(delta_x - delta_y)
+    grid = np.ascontiguousarray(map.data_int, dtype=np.int8)
+    cost, expansions = astar(grid, initial_state.get_x(), initial_state.get_y(), goal_state.get_x(), goal_state.get_y())
 
-    return h
\ No newline at end of file
+    return float(cost), int(expansions)
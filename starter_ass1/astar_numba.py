@@ -0,0 +1,123 @@
+import numpy as np
+from numba import njit
+
+#bit layout of the heap entries: 2 * f | 2 * h | cell index
+_H_SHIFT = 26
+_F_SHIFT = 44
+_INDEX_MASK = (1 << _H_SHIFT) - 1
+_H_MASK = (1 << (_F_SHIFT - _H_SHIFT)) - 1
+
+
+@njit(cache=True)
+def _sift_up(heap, i):
+    """
+    Moves the entry at position i of the heap up until its parent is not larger than it.
+    """
+    item = heap[i]
+    while i > 0:
+        parent = (i - 1) >> 1
+        if heap[parent] <= item:
+            break
+        heap[i] = heap[parent]
+        i = parent
+    heap[i] = item
+
+
+@njit(cache=True)
+def _sift_down(heap, size):
+    """
+    Moves the entry at the root of the heap down until none of its children is smaller than it.
+    """
+    item = heap[0]
+    i = 0
+    child = 1
+    while child < size:
+        if child + 1 < size and heap[child + 1] < heap[child]:
+            child += 1
+        if item <= heap[child]:
+            break
+        heap[i] = heap[child]
+        i = child
+        child = 2 * i + 1
+    heap[i] = item
+
+
+@njit(cache=True)
+def astar(grid, sx, sy, gx, gy):
+    """
+    A* search over a grid where non-traversable cells have the value of 1. Returns the cost of the
+    path between (sx, sy) and (gx, gy) and the number of nodes expanded; the cost is -1 if no path exists.
+
+    OPEN is a binary heap of int64 entries packing 2 * f-value, 2 * h-value and the cell index
+    y * width + x, from the most to the least significant bits; all costs are multiples of 0.5, so
+    2 * f and 2 * h are exact integers. Ties in f are broken in favour of the lower h-value, i.e. the
+    node closer to the goal, which keeps the heuristic admissible. The h-value of a node is computed
+    once, when it is pushed.
+
+    CLOSED is the grid of best g-values found so far; heap entries whose f-value no longer matches the
+    g-value of their cell are skipped when popped.
+
+    The diagonal coefficient of the octile distance is 1.5, the cost of diagonal moves in Map.cost.
+    """
+    height, width = grid.shape
+    g_values = np.full((height, width), np.inf, dtype=np.float32)
+    #every cell is expanded at most once and pushes at most 8 children
+    heap = np.empty(8 * height * width + 1, dtype=np.int64)
+    expansions = 0
+
+    dx = abs(sx - gx)
+    dy = abs(sy - gy)
+    h = 1.5 * min(dx, dy) + abs(dx - dy)
+    g_values[sy, sx] = 0.0
+    heap[0] = (np.int64(2.0 * h) << _F_SHIFT) | (np.int64(2.0 * h) << _H_SHIFT) | (sy * width + sx)
+    size = 1
+
+    while size > 0:
+        top = heap[0]
+        size -= 1
+        if size > 0:
+            heap[0] = heap[size]
+            _sift_down(heap, size)
+
+        node = top & _INDEX_MASK
+        x = node % width
+        y = node // width
+        g = g_values[y, x]
+
+        if (top >> _F_SHIFT) > np.int64(2.0 * g) + ((top >> _H_SHIFT) & _H_MASK):
+            continue
+
+        expansions += 1
+        if x == gx and y == gy:
+            return g, expansions
+
+        for i in range(-1, 2):
+            for j in range(-1, 2):
+                if i == 0 and j == 0:
+                    continue
+                nx = x + i
+                ny = y + j
+                if nx < 0 or ny < 0 or nx >= width or ny >= height:
+                    continue
+                if grid[ny, nx] == 1:
+                    continue
+
+                if i == 0 or j == 0:
+                    child_g = g + 1.0
+                else:
+                    child_g = g + 1.5
+
+                if child_g < g_values[ny, nx]:
+                    g_values[ny, nx] = child_g
+                    dx = abs(nx - gx)
+                    dy = abs(ny - gy)
+                    h = 1.5 * min(dx, dy) + abs(dx - dy)
+                    heap[size] = (
+                        (np.int64(2.0 * (child_g + h)) << _F_SHIFT)
+                        | (np.int64(2.0 * h) << _H_SHIFT)
+                        | (ny * width + nx)
+                    )
+                    _sift_up(heap, size)
+                    size += 1
+
+    return np.float32(-1.0), expansions
@@ -1,17 +1,21 @@
 import heapq
+import itertools
 
 def djikstra_search(initial_state, goal_state, map):
     open_heap = []
-    closed_dict = {}
+    #CLOSED is a flat list with the lowest g-value found for each cell, indexed by the state hash
+    closed = [float('inf')] * (map.width * map.height)
     expansions = 0
+    #OPEN stores (cost, counter, state) tuples, so heapq compares numbers instead of calling State.__lt__
+    counter = itertools.count()
     
     #Insert initial state to open and closed
-    heapq.heappush(open_heap, initial_state)
-    closed_dict[initial_state.state_hash()] = initial_state.get_cost()
+    heapq.heappush(open_heap, (initial_state.get_cost(), next(counter), initial_state))
+    closed[initial_state.state_hash()] = initial_state.get_cost()
 
     while len(open_heap) > 0:
         expansions += 1
-        n = heapq.heappop(open_heap)
+        _, _, n = heapq.heappop(open_heap)
         
         if n == goal_state: 
             return n.get_cost(), expansions
@@ -19,13 +23,15 @@ def djikstra_search(initial_state, goal_state, map):
         successors = map.successors(n)
         
         for child in successors:
+            hash_value = child.state_hash()
+
             #if child has not been seen or cost is lower
-            if child.state_hash() not in closed_dict or child.get_g() < closed_dict[child.state_hash()]:
+            if child.get_g() < closed[hash_value]:
                 
                 #update cost of state and add to open and closed
                 child.set_cost(child.get_g())
-                heapq.heappush(open_heap, child)
-                closed_dict[child.state_hash()] = child.get_cost()
+                heapq.heappush(open_heap, (child.get_cost(), next(counter), child))
+                closed[hash_value] = child.get_cost()
 
 
     return -1, expansions
\ No newline at end of file
@@ -16,12 +16,13 @@ class State:
     def __init__(self, x, y):
         """
         Constructor - requires the values of x and y of the state. All the other variables are
-        initialized with the value of 0.
+        initialized with the value of 0. The hash value is computed here, as x and y never change.
         """
         self._x = x
         self._y = y
         self._g = 0
         self._cost = 0
+        self._hash = y * State.map_width + x
         
     def __repr__(self):
         """
@@ -43,7 +44,7 @@ class State:
         hash function for the problem (i.e., no two states will have the same hash value). This function
         is used to implement the CLOSED list of the algorithms. 
         """
-        return self._y * State.map_width + self._x
+        return self._hash
     
     def __eq__(self, other):
         """
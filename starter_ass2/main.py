@@ -1,4 +1,8 @@
-from search.algorithms import CBS, CBSState, State
+import getopt
+import os
+import sys
+
+from search.algorithms import CBS, CBSState, State, astar_pool
 from search.map import Map
 
 
@@ -25,6 +29,12 @@ def read_instances(test_instances):
 
 
 def main():
+    """
+    Solves the test instances with CBS. Run it with the --parallel option to compute the paths
+    of the agents in parallel worker processes.
+    """
+    optlist, _ = getopt.getopt(sys.argv[1:], '', ['parallel'])
+    parallel = ('--parallel', '') in optlist
 
     gridded_map = Map("dao-map/test_map.map")
     starts = [State(1, 1), State(5, 1)]
@@ -48,8 +58,16 @@ def main():
 
     problems = read_instances(test_instances)
     gridded_map = Map(name_map)
+
+    # with --parallel, the A* searches of the agents run in parallel if there is more than one core
+    pool = None
+    max_agents = max((len(problem[0]) for problem in problems), default=0)
+    num_workers = min(max_agents, os.cpu_count() or 1)
+    if parallel and num_workers > 1:
+        pool = astar_pool(gridded_map, num_workers)
+
     for problem in problems:
-        cbs_state = CBSState(gridded_map, problem[0], problem[1])
+        cbs_state = CBSState(gridded_map, problem[0], problem[1], pool)
         cbs_search = CBS()
         _, cost = cbs_search.search(cbs_state)
 
@@ -62,6 +80,9 @@ def main():
         else:
             print('Correctly Solved: ', problem[2], cost)
 
+    if pool is not None:
+        pool.shutdown()
+
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,6 @@
-import copy
 import heapq
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 
 
 class State:
@@ -43,11 +44,12 @@ class State:
 
     def __hash__(self):
         """
-        Given a state (x, y), this method returns the value of x * map_width + y. This is a perfect
-        hash function for the problem (i.e., no two states will have the same hash value). This function
-        is used to implement the CLOSED list of the algorithms.
+        Given a state (x, y) with g-value g, this method returns y * map_width + x in the lower 32 bits
+        and g in the upper bits of an int. This is a perfect hash function for the problem (i.e., no two
+        states will have the same hash value). This function is used to implement the CLOSED list of the
+        algorithms.
         """
-        return hash((self._y * State.map_width + self._x, self._g))
+        return (self._g << 32) | (self._y * State.map_width + self._x)
 
     def __eq__(self, other):
         """
@@ -111,22 +113,26 @@ class State:
         """
         Returns the Manhattan distance heuristic between the state and the target state.
         """
-        dist_x = abs(self.get_x() - target_state.get_x())
-        dist_y = abs(self.get_y() - target_state.get_y())
+        dist_x = self._x - target_state._x
+        dist_y = self._y - target_state._y
 
-        return dist_x + dist_y
+        return (dist_x if dist_x >= 0 else -dist_x) + (dist_y if dist_y >= 0 else -dist_y)
 
 
 class CBSState:
 
-    def __init__(self, map, starts, goals):
+    def __init__(self, map, starts, goals, pool=None):
         """
         Constructor of the CBS state. Initializes cost, constraints, maps, start and goal locations,
         number of agents, and the solution paths.
+
+        If pool is a pool returned by astar_pool for the same map, the A* search of each agent runs
+        in a worker process of the pool; otherwise the searches run sequentially.
         """
         self._cost = 0
         self._constraints = {}
         self._map = map
+        self._pool = pool
         self._starts = starts
         self._goals = goals
         self._k = len(starts)
@@ -137,16 +143,25 @@ class CBSState:
 
         self._paths = {}  # dict where key is i-th agent and value is list of
 
+        # h-values of agent i towards its goal; shared by reference with the children of the state
+        self._h_caches = {}
+
     def compute_cost(self):
         """
         Computes the cost of a CBS state. Assumes the sum of the cost of the paths as the objective function.
         """
         # compute solution path using a star for each agent i
-        astar = AStar(self._map)
-        for i in range(0, self._k):
-            cost, path = astar.search(
-                self._starts[i], self._goals[i], self._constraints[i]
+        if self._pool is not None:
+            results = self._pool.map(
+                _astar_worker,
+                self._starts,
+                self._goals,
+                [self._constraints[i] for i in range(0, self._k)],
             )
+        else:
+            results = self._search_sequentially()
+
+        for i, (cost, path) in enumerate(results):
             # if a star doesnt find solution for some agent with given constraints
             if cost == -1:
                 self._cost = -1
@@ -156,44 +171,41 @@ class CBSState:
             # add cost to sum
             self._cost += cost
 
+    def _search_sequentially(self):
+        """
+        Yields the cost and the path A* finds for each agent, one agent at a time.
+        """
+        astar = AStar(self._map)
+        for i in range(0, self._k):
+            if i not in self._h_caches:
+                self._h_caches[i] = astar.new_h_cache()
+            yield astar.search(
+                self._starts[i], self._goals[i], self._constraints[i], self._h_caches[i]
+            )
+
     def is_solution(self):
         """
         Verifies whether a CBS state is a solution. If it isn't, it returns False and a tuple with
         the conflicting state and time step; returns True, None otherwise.
         """
-        # loop through solution steps and check if any of the agents are at the same
-        # state during the same time step
-
-        # for each time step
-        valid_solution = True
-        time_step = 0
-        agents_finished = 0
-        conflict_tuple = None
-
-        while agents_finished < self._k:
-            step_set = set()
-            agents_finished = 0
-            # for each agent
-            for i in range(0, self._k):
-                # check if agent has a state in this time
-                if time_step < len(self._paths[i]):
-                    # get state of agent
-                    current_state = self._paths[i][time_step]
-                    # if so, check if any other agent is there at the same time
-                    if current_state in step_set:
-                        # add constraint
-                        conflict_tuple = (current_state, current_state.get_g())
-                        valid_solution = False
-                    else:
-                        step_set.add(current_state)
-                else:
-                    agents_finished += 1
-            time_step += 1
-        return valid_solution, conflict_tuple
+        # single pass over the paths: the first agent seen at a cell in a time step is stored,
+        # and any other agent at the same cell in the same time step is a conflict
+        width = State.map_width
+        seen = set()
+        for i in range(0, self._k):
+            for time_step, state in enumerate(self._paths[i]):
+                key = (time_step, state._y * width + state._x)
+                if key in seen:
+                    return False, (state, time_step)
+                seen.add(key)
+        return True, None
 
     def successors(self):
         """
-        Generates the two children of a CBS state that doesn't represent a solution.
+        Generates the children of a CBS state that doesn't represent a solution: one child for each of
+        the first two agents in the conflict, each with a new constraint for that agent. An agent that
+        already has the constraint would give a child identical to this state, so it is skipped, and
+        the list may have fewer than two children.
         """
         successors_list = []
         valid, conflict_tuple = self.is_solution()
@@ -212,16 +224,22 @@ class CBSState:
                         agents.append(i)
 
             if len(agents) >= 2:
-                # if agents exist, initialize them and add them to the list
-                c1 = CBSState(self._map, self._starts, self._goals)
-                c1._constraints = copy.deepcopy(self._constraints)
-                c1.set_constraint(conflict_state, conflict_time, agents[0])
-                successors_list.append(c1)
+                # a child constraining an agent that already has this constraint would be
+                # identical to this state, so only the other agents get a child
+                key = (conflict_state.get_x(), conflict_state.get_y())
+                agents = [
+                    i for i in agents
+                    if conflict_time not in self._constraints[i].get(key, ())
+                ]
 
-                c2 = CBSState(self._map, self._starts, self._goals)
-                c2._constraints = copy.deepcopy(self._constraints)
-                c2.set_constraint(conflict_state, conflict_time, agents[1])
-                successors_list.append(c2)
+                # if agents exist, initialize them and add them to the list
+                for agent in agents[:2]:
+                    child = CBSState(self._map, self._starts, self._goals, self._pool)
+                    child._constraints = self._copy_with_constraint(
+                        conflict_state, conflict_time, agent
+                    )
+                    child._h_caches = self._h_caches
+                    successors_list.append(child)
 
             else:
                 print("error creating childs since not enough conflicting agents found")
@@ -232,17 +250,28 @@ class CBSState:
         """
         Sets a constraint for agent in conflict_state and conflict_time
         """
-        if (conflict_state.get_x(), conflict_state.get_y()) not in self._constraints[
-            agent
-        ]:
-            self._constraints[agent][
-                (conflict_state.get_x(), conflict_state.get_y())
-            ] = set()
-
-        self._constraints[agent][(conflict_state.get_x(), conflict_state.get_y())].add(
-            conflict_time
+        self._constraints = self._copy_with_constraint(
+            conflict_state, conflict_time, agent
         )
 
+    def _copy_with_constraint(self, conflict_state, conflict_time, agent):
+        """
+        Returns the constraints of the state with an added constraint for agent in conflict_state
+        and conflict_time. The constraints are never modified in place: only the dictionary of agent
+        is copied, and the dictionaries of the other agents and the frozensets of times are shared
+        with the constraints of the state.
+        """
+        key = (conflict_state.get_x(), conflict_state.get_y())
+        agent_constraints = dict(self._constraints[agent])
+        if key in agent_constraints:
+            agent_constraints[key] = agent_constraints[key] | {conflict_time}
+        else:
+            agent_constraints[key] = frozenset((conflict_time,))
+
+        constraints = dict(self._constraints)
+        constraints[agent] = agent_constraints
+        return constraints
+
     def get_paths(self):
         """
         Returns a list of lists with the paths of agent i at index i-1
@@ -284,11 +313,12 @@ class CBS:
         start.compute_cost()
         if start.get_cost() == -1:
             return None, None
-        #initialize open list
+        #initialize open list with (cost, counter, state) tuples
         OPEN = []
-        heapq.heappush(OPEN, start)
+        counter = itertools.count()
+        heapq.heappush(OPEN, (start.get_cost(), next(counter), start))
         while len(OPEN) > 0:
-            node = heapq.heappop(OPEN)
+            _, _, node = heapq.heappop(OPEN)
             #check if node is a solution
             valid_solution, conflict_state = node.is_solution()
             if valid_solution:
@@ -299,25 +329,85 @@ class CBS:
             for child in children:
                 child.compute_cost()
                 if child.get_cost() != -1:
-                    heapq.heappush(OPEN, child)
+                    heapq.heappush(OPEN, (child.get_cost(), next(counter), child))
         return None, None
 
 
+# A* instance of each worker process of a pool returned by astar_pool
+_worker_astar = None
+# h-value caches of each worker process, keyed by the (x, y) coordinates of the goal
+_worker_h_caches = {}
+
+
+def _init_astar_worker(map_file_name):
+    """
+    Initializes a worker process of astar_pool. The map is loaded from its file, which also sets
+    the map dimensions in State for the worker process.
+    """
+    from search.map import Map
+
+    global _worker_astar
+    _worker_astar = AStar(Map(map_file_name))
+
+
+def _astar_worker(start, goal, constraints):
+    """
+    Runs A* in a worker process of astar_pool and returns the cost and the path it finds. The parents
+    of the states in the path are removed so that it can be sent back without pickling the search tree.
+    """
+    key = (goal.get_x(), goal.get_y())
+    if key not in _worker_h_caches:
+        _worker_h_caches[key] = _worker_astar.new_h_cache()
+    cost, path = _worker_astar.search(start, goal, constraints, _worker_h_caches[key])
+    if path is not None:
+        for state in path:
+            state.set_parent(None)
+    return cost, path
+
+
+def astar_pool(gridded_map, max_workers=None):
+    """
+    Returns a process pool whose workers run A* on gridded_map. The pool can be passed to CBSState
+    so that the paths of the agents are computed in parallel.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_astar_worker,
+        initargs=(gridded_map.file_name,),
+    )
+
+
 class AStar:
 
     def __init__(self, gridded_map):
         """
-        Constructor of A*. Creates the datastructures OPEN and CLOSED.
+        Constructor of A*. Creates the datastructures OPEN and CLOSED. OPEN is a heap of
+        (cost, -g, counter, state) tuples: ties in f are broken in favour of the deeper node, and
+        then in insertion order. CLOSED maps the hash of a state to its g-value.
         """
         self.map = gridded_map
         self.OPEN = []
         self.CLOSED = {}
+        self.h_cache = None
+
+    def new_h_cache(self):
+        """
+        Returns an empty cache of h-values, with one entry per cell of the map. Entries are -1
+        until the h-value of the cell is computed.
+        """
+        return [-1] * (State.map_width * State.map_height)
 
     def compute_cost(self, state):
         """
-        Computes the f-value of nodes in the A* search
+        Computes the f-value of nodes in the A* search. The h-value of each cell is computed once
+        and stored in h_cache, as the same cell is generated with many different g-values.
         """
-        state.set_cost(state.get_g() + state.get_heuristic(self.goal))
+        index = state._y * State.map_width + state._x
+        h = self.h_cache[index]
+        if h < 0:
+            h = state.get_heuristic(self.goal)
+            self.h_cache[index] = h
+        state.set_cost(state._g + h)
 
     def _recover_path(self, node):
         """
@@ -330,44 +420,51 @@ class AStar:
         path.append(node)
         return path[::-1]
 
-    def search(self, start, goal, constraints=None):
+    def search(self, start, goal, constraints=None, h_cache=None):
         """
         A* Algorithm: receives a start state and a goal state as input. It returns the
         cost of a path between start and goal and the number of nodes expanded.
 
+        h_cache can be a cache returned by new_h_cache that was only used with the same goal; if
+        it is None, a new cache is created.
+
         If a solution isn't found, it returns -1 for the cost.
         """
         self.start = start
         self.goal = goal
+        self.h_cache = h_cache if h_cache is not None else self.new_h_cache()
 
         self.compute_cost(self.start)
 
         self.OPEN.clear()
         self.CLOSED.clear()
 
-        heapq.heappush(self.OPEN, self.start)
-        self.CLOSED[start.__hash__()] = self.start
+        width = State.map_width
+        # OPEN stores (cost, -g, counter, state) tuples, so heapq compares numbers instead of calling
+        # State.__lt__; among nodes with the same f-value the deepest one is expanded first
+        counter = itertools.count()
+        heapq.heappush(self.OPEN, (self.start.get_cost(), -self.start.get_g(), next(counter), self.start))
+        self.CLOSED[start.__hash__()] = self.start.get_g()
         while len(self.OPEN) > 0:
-            node = heapq.heappop(self.OPEN)
+            _, _, _, node = heapq.heappop(self.OPEN)
 
             if node.is_goal(self.goal):
                 return node.get_g(), self._recover_path(node)
 
-            children = self.map.successors(node, constraints)
+            xs, ys, g = self.map.successors_arrays(node, constraints)
 
-            for child in children:
-                hash_value = child.__hash__()
-                self.compute_cost(child)
-                child.set_parent(node)
-
-                if hash_value not in self.CLOSED:
-                    heapq.heappush(self.OPEN, child)
-                    self.CLOSED[hash_value] = child
-
-                if (
-                    hash_value in self.CLOSED
-                    and self.CLOSED[hash_value].get_g() > child.get_g()
-                ):
-                    heapq.heappush(self.OPEN, child)
-                    self.CLOSED[hash_value] = child
+            # states are only created for the children that are added to OPEN
+            for x, y in zip(xs, ys):
+                hash_value = (g << 32) | (y * width + x)
+
+                closed_g = self.CLOSED.get(hash_value)
+
+                if closed_g is None or closed_g > g:
+                    child = State(x, y)
+                    child.set_g(g)
+                    self.compute_cost(child)
+                    child.set_parent(node)
+
+                    heapq.heappush(self.OPEN, (child.get_cost(), -g, next(counter), child))
+                    self.CLOSED[hash_value] = g
         return -1, None
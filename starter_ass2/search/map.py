@@ -22,6 +22,9 @@ class Map:
         self.convert_data()
         
         self.map_file.close()
+
+        # cell index -> (x coordinates, y coordinates) of the valid neighbors of the cell
+        self.neighbors = {}
         
     def read_map(self):
         """
@@ -158,4 +161,33 @@ class Map:
                             s = State(state.get_x() + i, state.get_y() + j)
                             s.set_g(state.get_g() + 1)
                             children.append(s)
-        return children
\ No newline at end of file
+        return children
+
+    def successors_arrays(self, state, constraints=None):
+        """
+        Transition function that doesn't create states: receives a state and returns two lists with the
+        x and y coordinates of its neighbors, in the same order as successors, and the g-value shared
+        by all of them. The valid neighbors of each cell are computed once and cached in self.neighbors.
+        """
+        x = state._x
+        y = state._y
+        g = state._g + 1
+
+        index = y * self.width + x
+        if index not in self.neighbors:
+            xs = []
+            ys = []
+            for i in range(-1, 2):
+                for j in range(-1, 2):
+                    if (i == 0 or j == 0) and self.is_valid_pair(x + i, y + j):
+                        xs.append(x + i)
+                        ys.append(y + j)
+            self.neighbors[index] = (xs, ys)
+        xs, ys = self.neighbors[index]
+
+        if constraints:
+            constrained = [k for k in range(len(xs)) if g in constraints.get((xs[k], ys[k]), ())]
+            if constrained:
+                xs = [xs[k] for k in range(len(xs)) if k not in constrained]
+                ys = [ys[k] for k in range(len(ys)) if k not in constrained]
+        return xs, ys, g
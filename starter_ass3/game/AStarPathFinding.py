@@ -15,19 +15,24 @@ class AStarPathFinding:
         self._w : int = a_width;
         self._h : int = height; 
         self._free : list[list[bool]] = np.array((self._w,self._h),dtype=bool)    #[[None for i in range(self._w)] for j in range(self._h)]
-        self._closed : list[int] = np.zeros((self._w*self._h),dtype=np.int16)# [0 for _ in range(self._w*self._h)]
-        self._open : list[int] =  np.zeros((self._w*self._h),dtype=np.int16)   # open list
-        self._heuristic : list[int] = np.zeros((self._w*self._h),dtype=np.int16)    # heuristic value of the elements in 'open'
-        self._parents : list[int] = np.zeros((self._w*self._h),dtype=np.int16)  #[0 for _ in range(self._w*self._h)]
-        self._cost : list[int] = np.zeros((self._w*self._h),dtype=np.int16)  # [0 for _ in range(self._w*self._h)]     # cost of reaching a given position so far
-        self._inOpenOrClosed : list[int] = np.zeros((self._w*self._h),dtype=np.int16)# [0 for _ in range(self._w*self._h)]
+        # plain lists: this is the hot loop of the playouts, and reading or writing a single
+        # element of a list is much cheaper than of a numpy array
+        self._closed : list[int] = [-1 for _ in range(self._w*self._h)]
+        self._open : list[int] = []   # open list, sorted by decreasing f-value
+        self._heuristic : list[int] = []    # heuristic value of the elements in 'open'
+        self._parents : list[int] = []
+        self._cost : list[int] = [0 for _ in range(self._w*self._h)]     # cost of reaching a given position so far
+        self._inOpenOrClosed : list[int] = [0 for _ in range(self._w*self._h)]
         self._openinsert : int = 0;
        
     
     def clear(self,gs :GameState)->None:
         self._free = gs._free
-        self._closed[:] = -1;
-        self._inOpenOrClosed[:] = 0;
+        self._closed = [-1] * (self._w*self._h)
+        self._inOpenOrClosed = [0] * (self._w*self._h)
+        self._open.clear()
+        self._heuristic.clear()
+        self._parents.clear()
      
         
 
@@ -49,24 +54,24 @@ class AStarPathFinding:
          startPos  : int= start.getY() * self._w + start.getX();
 
 
-         self._openinsert = 0;
-         self._open[self._openinsert] = startPos;
-         self._heuristic[self._openinsert] = self.manhattanDistance(start.getX(), start.getY(), targetx, targety);
-         self._parents[self._openinsert] = startPos;
+         self._open.append(startPos);
+         self._heuristic.append(self.manhattanDistance(start.getX(), start.getY(), targetx, targety));
+         self._parents.append(startPos);
          self._inOpenOrClosed[startPos] = 1;
          self._cost[startPos] = 0;
-         self._openinsert+=1
+         self._openinsert = 1
 
+         free = self._free
+         max_cont = (abs(start.getX()-targetx) + abs(start.getY()-targety))*2
          cont=0
          while self._openinsert > 0:
              cont+=1
-             dx= abs(start.getX()-targetx )
-             dy =abs(start.getY()-targety )
-             if cont > (dx+dy)*2:
+             if cont > max_cont:
                  return  UnitAction.build_None()
              self._openinsert-=1
-             pos : int  = self._open[self._openinsert];
-             parent : int = self._parents[self._openinsert];
+             self._heuristic.pop()
+             pos : int  = self._open.pop();
+             parent : int = self._parents.pop();
              
              if self._closed[pos] != -1: continue;
 
@@ -97,14 +102,14 @@ class AStarPathFinding:
                 
                 #if self._free[x][y - 1] == None: self._free[x][y - 1] = gs.free(x, y - 1);
                 
-                if  self._free[x][y - 1]:
+                if  free[x, y - 1]:
                     #if start.getPlayer() == 0:print("ok0",self.manhattanDistance(x, y - 1, targetx, targety))
                     self.addToOpen(x, y - 1, pos -  self._w, pos,  self.manhattanDistance(x, y - 1, targetx, targety));
 
              if x < pgs.getWidth() - 1 and  self._inOpenOrClosed[pos + 1] == 0:
                 #if  self._free[x + 1][y] == None:  self._free[x + 1][y] = gs.free(x + 1, y);
                  
-                if  self._free[x + 1][y]:
+                if  free[x + 1, y]:
                     #if start.getPlayer() == 0:print("ok1",self.manhattanDistance(x + 1, y, targetx, targety))
                     self.addToOpen(x + 1, y, pos + 1, pos,  self.manhattanDistance(x + 1, y, targetx, targety));
                  
@@ -112,7 +117,7 @@ class AStarPathFinding:
              if y < pgs.getHeight() - 1 and  self._inOpenOrClosed[pos +  self._w] == 0:
                 #if  self._free[x][y + 1] == None:  self._free[x][y + 1] = gs.free(x, y + 1);
                
-                if  self._free[x][y + 1]:
+                if  free[x, y + 1]:
                     #if start.getPlayer() == 0: print("ok2",self.manhattanDistance(x, y + 1, targetx, targety))
                     self.addToOpen(x, y + 1, pos +  self._w, pos,  self.manhattanDistance(x, y + 1, targetx, targety));
             
@@ -120,7 +125,7 @@ class AStarPathFinding:
              if x > 0 and  self._inOpenOrClosed[pos - 1] == 0:
                 #if  self._free[x - 1][y] == None:  self._free[x - 1][y] = gs.free(x - 1, y);
                
-                if  self._free[x - 1][y] :
+                if  free[x - 1, y] :
                     #if start.getPlayer() == 0:print("ok3",self.manhattanDistance(x - 1, y, targetx, targety)) 
                     self.addToOpen(x - 1, y, pos - 1, pos,  self.manhattanDistance(x - 1, y, targetx, targety));
         
@@ -151,45 +156,21 @@ class AStarPathFinding:
    
     #and keep the "open" list sorted:
     def addToOpen(self, x:int,  y : int, newPos:int, oldPos : int,  h : int)->None:
-        self._cost[newPos] = self._cost[oldPos] + 1;
+        cost = self._cost
+        cost[newPos] = cost[oldPos] + 1;
+        f = h + cost[newPos]
 
          # find the right position for the insert:
-        
-        for i in range(self._openinsert - 1,-1,-1):
-             
-             if self._heuristic[i] + self._cost[self._open[i]] >= h + self._cost[newPos]:
-                #System.out.println("Inserting at " + (i+1) + " / " + openinsert);
-                #shift all the elements:
-                self._open[i+1:self._openinsert+2] = self._open[i:self._openinsert+1]
-                self._heuristic[i+1:self._openinsert+2] = self._heuristic[i:self._openinsert+1]
-                self._parents[i+1:self._openinsert+2] = self._parents[i:self._openinsert+1]
-                #for j in range(self._openinsert,i,-1):
-                     #self._open[j] = self._open[j - 1];
-                     #self._heuristic[j] = self._heuristic[j - 1];
-                     #self._parents[j] = self._parents[j - 1];
-                 
-
-                 #insert at i+1:
-                self._open[i + 1] = newPos;
-                self._heuristic[i + 1] = h;
-                self._parents[i + 1] = oldPos;
-                self._openinsert+=1;
-                self._inOpenOrClosed[newPos] = 1;
-                return;
-
-        self._open[1:self._openinsert+2] = self._open[:self._openinsert+1]
-        self._heuristic[1:self._openinsert+2] = self._heuristic[:self._openinsert+1]
-        self._parents[1:self._openinsert+2] = self._parents[:self._openinsert+1]
-        #for j in range(self._openinsert,0,-1): 
-             #self._open[j] = self._open[j - 1];
-             #self._heuristic[j] = self._heuristic[j - 1];
-             #self._parents[j] = self._parents[j - 1];
-
-
-         #insert at i+1:
-        self._open[0] = newPos;
-        self._heuristic[0] = h;
-        self._parents[0] = oldPos;
+        open_list = self._open
+        heuristic = self._heuristic
+        i = self._openinsert - 1
+        while i >= 0 and heuristic[i] + cost[open_list[i]] < f:
+            i -= 1
+
+        #insert at i+1:
+        open_list.insert(i + 1, newPos)
+        heuristic.insert(i + 1, h)
+        self._parents.insert(i + 1, oldPos)
         self._openinsert+=1
         self._inOpenOrClosed[newPos] = 1;
 
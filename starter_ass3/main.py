@@ -1,6 +1,8 @@
 
+import os
 import random
 import time
+from concurrent.futures import ProcessPoolExecutor
 from evaluators.SimpleSqrtEvaluationFunction3MultiState import SimpleSqrtEvaluationFunction3MultiState
 from game.gameState import GameState
 from game.physicalGameState import PhysicalGameState
@@ -65,8 +67,8 @@ from synthesis.extent1DSL.neighborhood_functions.neighborhood import Neighborhoo
     
 #     return gs.winner(), 0
 
-def playout(gs_a, ai0, ai1, player, max_tick, show_screen, assistant_evaluator):
-    gs = gs_a.clone()
+def playout(snapshot, utt, ai0, ai1, player, max_tick, show_screen, assistant_evaluator):
+    gs = GameState.from_snapshot(snapshot, utt)
     ai0.reset()
     ai1.reset()
     if assistant_evaluator!=None: 
@@ -74,27 +76,43 @@ def playout(gs_a, ai0, ai1, player, max_tick, show_screen, assistant_evaluator):
 
     if show_screen:
         screen = ScreenMicroRTS(gs)
-    show = True
-    
-    while not gs.gameover() and gs.getTime()<max_tick:
-        if assistant_evaluator!=None:
-            assistant_evaluator.analysis(gs,player,False)
-        if show and show_screen:
-                screen.draw()
-                time.sleep(0.1) 
-
-        try:
-            pa0 :  PlayerAction =ai0.getActions(gs,player)
-        except Exception as e:
-            return 1-player  , -1
-
-        pa1 = ai1.getActions(gs,1 -player)
+        show = True
         
-        if show_screen: show = gs.updateScreen()
+        while not gs.gameover() and gs.getTime()<max_tick:
+            if assistant_evaluator!=None:
+                assistant_evaluator.analysis(gs,player,False)
+            if show:
+                    screen.draw()
+                    time.sleep(0.1) 
+
+            try:
+                pa0 :  PlayerAction =ai0.getActions(gs,player)
+            except Exception as e:
+                return 1-player  , -1
+
+            pa1 = ai1.getActions(gs,1 -player)
             
-        gs.issueSafe(pa0)
-        gs.issueSafe(pa1)      
-        gs.cycle()
+            show = gs.updateScreen()
+                
+            gs.issueSafe(pa0)
+            gs.issueSafe(pa1)      
+            gs.cycle()
+    else:
+        # same loop without the screen checks; this is the loop used by evaluate
+        while not gs.gameover() and gs.getTime()<max_tick:
+            if assistant_evaluator!=None:
+                assistant_evaluator.analysis(gs,player,False)
+
+            try:
+                pa0 :  PlayerAction =ai0.getActions(gs,player)
+            except Exception as e:
+                return 1-player  , -1
+
+            pa1 = ai1.getActions(gs,1 -player)
+                
+            gs.issueSafe(pa0)
+            gs.issueSafe(pa1)      
+            gs.cycle()
     if assistant_evaluator!=None:
         assistant_evaluator.analysis(gs,player,True)
         
@@ -109,20 +127,50 @@ def winToScore(player, result):
     if 1 - player == result: return 0.0
     return 0.5
 
-def evaluate(node, target_program, gs, max_tick):
+def evaluate(node, target_program, gs, max_tick, snapshot=None):
+    """
+    Plays node against target_program once as each player. Both playouts start from snapshot,
+    which should be gs.fast_snapshot(); callers evaluating many programs on the same gs take it
+    once and pass it, otherwise it is taken here.
+    """
+    if snapshot is None:
+        snapshot = gs.fast_snapshot()
     eval = SimpleSqrtEvaluationFunction3MultiState()
     utt = gs.getUnitTypeTable()
     a1 = Interpreter(gs.getPhysicalGameState(),utt,node)
     score = 0
     
     a2 = Interpreter(gs.getPhysicalGameState(),utt,target_program)
-    win, auxiliary_score0 = playout(gs,a1,a2,0,max_tick,False,eval)
+    win, auxiliary_score0 = playout(snapshot,utt,a1,a2,0,max_tick,False,eval)
     score += winToScore(0, win)
-    win, auxiliary_score1 = playout(gs,a1,a2,1,max_tick,False,eval)
+    win, auxiliary_score1 = playout(snapshot,utt,a1,a2,1,max_tick,False,eval)
     score += winToScore(1, win)
         
     return score/2,(auxiliary_score0+auxiliary_score1)/2
 
+# game state, its snapshot and target program of each worker process created in search
+_worker_gs = None
+_worker_snapshot = None
+_worker_target_program = None
+
+def init_evaluation_worker(map, target_program):
+    """
+    Initializes a worker process of search. The game state is loaded from the map
+    in the worker, so it never has to be pickled.
+    """
+    global _worker_gs, _worker_snapshot, _worker_target_program
+    utt = UnitTypeTable(2)
+    pgs = PhysicalGameState.load(map, utt)
+    _worker_gs = GameState(pgs, utt)
+    _worker_snapshot = _worker_gs.fast_snapshot()
+    _worker_target_program = target_program
+
+def evaluate_in_worker(node, max_tick):
+    """
+    Evaluates node against the target program of the worker process.
+    """
+    return evaluate(node, _worker_target_program, _worker_gs, max_tick, _worker_snapshot)
+
 def visualize_game(program_1, program_2):
     utt = UnitTypeTable(2)
     pgs = PhysicalGameState.load(map, utt)
@@ -137,9 +185,21 @@ def visualize_game(program_1, program_2):
     print("Winner = ", win[0] + 1)
 
 def search(target_program, neighborhood_function, num_neighbors, max_tick, map):
+    # the candidates of each local search step are evaluated in parallel if there is more than one core
+    num_workers = min(num_neighbors, os.cpu_count() or 1)
+    if num_workers == 1:
+        return local_search(target_program, neighborhood_function, num_neighbors, max_tick, map, None)
+    with ProcessPoolExecutor(max_workers=num_workers,
+                             initializer=init_evaluation_worker,
+                             initargs=(map, target_program)) as pool:
+        return local_search(target_program, neighborhood_function, num_neighbors, max_tick, map, pool)
+
+def local_search(target_program, neighborhood_function, num_neighbors, max_tick, map, pool):
         utt = UnitTypeTable(2)
         pgs = PhysicalGameState.load(map, utt)
         gs = GameState(pgs, utt)
+        # every evaluation starts from the same state, so it is serialized only once
+        snapshot = gs.fast_snapshot()
 
         seed_search = ScriptsToy.scriptEmpty()
         total_number_evaluations = 0
@@ -154,7 +214,7 @@ def search(target_program, neighborhood_function, num_neighbors, max_tick, map):
             else:
                 seed_search = best_overall_prog
             
-            best_local_eval, best_local_auxiliary = evaluate(seed_search, target_program, gs, max_tick)
+            best_local_eval, best_local_auxiliary = evaluate(seed_search, target_program, gs, max_tick, snapshot)
             total_number_evaluations += 1
             best_local_prog = seed_search
             improved_local = True
@@ -162,9 +222,13 @@ def search(target_program, neighborhood_function, num_neighbors, max_tick, map):
             while improved_local:
                 improved_local = False
                 prog_candidates = neighborhood_function.get_neighbors(best_local_prog, num_neighbors)
+                if pool is not None:
+                    futures = [pool.submit(evaluate_in_worker, candidate_prog, max_tick) for candidate_prog in prog_candidates]
+                    results = [future.result() for future in futures]
+                else:
+                    results = (evaluate(candidate_prog, target_program, gs, max_tick, snapshot) for candidate_prog in prog_candidates)
                 
-                for candidate_prog in prog_candidates:
-                    candidate_eval, candidate_auxiliary = evaluate(candidate_prog, target_program, gs, max_tick)
+                for candidate_prog, (candidate_eval, candidate_auxiliary) in zip(prog_candidates, results):
                     total_number_evaluations += 1
                     
                     if (candidate_eval > best_local_eval) or ((candidate_eval == best_local_eval) and (candidate_auxiliary > best_local_auxiliary)):                    